@@ -7,7 +7,7 @@ import logging
 
 from backend.api.middleware import setup_middleware
 from backend.api.routes import aggregator, websocket, compiler, autonomous, boost, workflow, openrouter
-from backend.shared.lm_studio_client import lm_studio_client
+from backend.shared.lm_studio_client import lm_studio_client, shutdown_client
 from backend.aggregator.core.coordinator import coordinator
 from backend.compiler.core.compiler_coordinator import compiler_coordinator
 from backend.autonomous.core.autonomous_coordinator import autonomous_coordinator
@@ -86,7 +86,7 @@ async def lifespan(app: FastAPI):
     await coordinator.stop()
     await compiler_coordinator.stop()
     await autonomous_coordinator.stop()
-    await lm_studio_client.close()
+    await shutdown_client()
     logger.info("Shutdown complete")
 
 
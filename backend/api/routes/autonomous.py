@@ -1493,7 +1493,7 @@ async def request_paper_critique(paper_id: str, request: CritiqueRequest = None)
     from backend.shared.models import PaperCritique, CritiqueRequest
     from backend.shared.api_client_manager import api_client_manager
     from backend.shared.json_parser import parse_json
-    from backend.shared.utils import count_tokens
+    from backend.shared.utils import count_tokens_async
     import os
     import uuid
     from datetime import datetime
@@ -1554,7 +1554,7 @@ async def request_paper_critique(paper_id: str, request: CritiqueRequest = None)
         full_prompt = build_critique_prompt(content, metadata.title, prompt_to_use)
         
         # Count tokens in the prompt
-        prompt_tokens = count_tokens(full_prompt)
+        prompt_tokens = await count_tokens_async(full_prompt)
         
         # Calculate available input tokens (context window - output reserve - safety margin)
         output_reserve = validator_max_tokens
@@ -1784,7 +1784,7 @@ async def request_final_answer_critique(answer_id: str, request: CritiqueRequest
     from backend.shared.models import PaperCritique, CritiqueRequest
     from backend.shared.api_client_manager import api_client_manager
     from backend.shared.json_parser import parse_json
-    from backend.shared.utils import count_tokens
+    from backend.shared.utils import count_tokens_async
     from pathlib import Path
     import uuid
     from datetime import datetime
@@ -1851,7 +1851,7 @@ async def request_final_answer_critique(answer_id: str, request: CritiqueRequest
         full_prompt = build_critique_prompt(content, title, prompt_to_use)
         
         # Count tokens in the prompt
-        prompt_tokens = count_tokens(full_prompt)
+        prompt_tokens = await count_tokens_async(full_prompt)
         
         # Calculate available input tokens
         output_reserve = validator_max_tokens
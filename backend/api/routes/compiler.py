@@ -458,7 +458,7 @@ async def request_compiler_critique(critique_request: CritiqueRequest = None):
     from backend.shared.models import PaperCritique
     from backend.shared.api_client_manager import api_client_manager
     from backend.shared.json_parser import parse_json
-    from backend.shared.utils import count_tokens
+    from backend.shared.utils import count_tokens_async
     import uuid
     from datetime import datetime
     
@@ -511,7 +511,7 @@ async def request_compiler_critique(critique_request: CritiqueRequest = None):
         full_prompt = build_critique_prompt(paper_content, paper_title, prompt_to_use)
         
         # Count tokens in the prompt
-        prompt_tokens = count_tokens(full_prompt)
+        prompt_tokens = await count_tokens_async(full_prompt)
         
         # Calculate available input tokens (context window - output reserve - safety margin)
         output_reserve = validator_max_tokens
@@ -32,6 +32,10 @@ class ConnectionManager:
     
     async def broadcast(self, event_type: str, data: Dict):
         """Broadcast message to all connected clients."""
+        # Nothing to send to; skip serializing the payload
+        if not self.active_connections:
+            return
+        
         message = json.dumps({
             "type": event_type,
             "data": data
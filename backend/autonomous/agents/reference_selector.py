@@ -27,7 +27,7 @@ from typing import Optional, Dict, Any, List, Tuple, Callable
 from backend.shared.lm_studio_client import lm_studio_client
 from backend.shared.api_client_manager import api_client_manager
 from backend.shared.json_parser import parse_json
-from backend.shared.utils import count_tokens
+from backend.shared.utils import count_tokens, count_tokens_batch_async
 from backend.shared.config import rag_config
 from backend.shared.models import ReferenceExpansionRequest, ReferenceSelectionResult
 from backend.autonomous.prompts.paper_reference_prompts import (
@@ -325,7 +325,7 @@ class ReferenceSelectorAgent:
             
             # Calculate total tokens for all expanded papers
             total_paper_tokens = sum(
-                count_tokens(p.get("content", "")) for p in expanded_papers
+                await count_tokens_batch_async([p.get("content", "") for p in expanded_papers])
             )
             
             # Reserve ~40% of context for papers, rest for prompts/brainstorm
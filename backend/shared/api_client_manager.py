@@ -692,6 +692,11 @@ class APIClientManager:
         logger.debug(f"Role {role_id} using LM Studio: {model}")
         start_time = time.time()
         
+        # Let LM Studio reject oversized prompts early against this role's own window
+        # (a fallback model's window is unknown, so it is left to the server)
+        if role_config and role_config.provider == "lm_studio":
+            kwargs.setdefault("context_window", role_config.context_window)
+        
         try:
             result = await lm_studio_client.generate_completion(
                 model=model,
@@ -8,6 +8,7 @@ Supports three boost modes:
 3. Per-task Toggle - Task ID based (may have ID matching issues with workflow predictions)
 """
 import asyncio
+import functools
 import logging
 from typing import Optional, Set, Callable, Any, Dict, List
 
@@ -43,6 +44,51 @@ CATEGORY_PREFIXES = {
     "auto_prc": "Paper Redundancy Checker",
 }
 
+# Window for coalescing bursts of boost_next_count_updated broadcasts
+COUNT_BROADCAST_DELAY_SECONDS = 0.1
+
+# Boost categories shown in the UI, grouped by workflow mode (built once at import)
+_AGGREGATOR_CATEGORIES = tuple(
+    {"id": f"agg_sub{i}", "label": f"Sub {i}", "group": "Aggregator"}
+    for i in range(1, 11)
+) + (
+    {"id": "agg_val", "label": "Validator", "group": "Aggregator"},
+)
+
+_COMPILER_CATEGORIES = (
+    {"id": "comp_hc", "label": "High-Context", "group": "Compiler"},
+    {"id": "comp_hp", "label": "High-Param", "group": "Compiler"},
+    {"id": "comp_val", "label": "Validator", "group": "Compiler"},
+)
+
+_AUTONOMOUS_CATEGORIES = (
+    {"id": "auto_ts", "label": "Topic Sel", "group": "Autonomous"},
+    {"id": "auto_tv", "label": "Topic Val", "group": "Autonomous"},
+    {"id": "auto_cr", "label": "Completion", "group": "Autonomous"},
+    {"id": "auto_rs", "label": "Ref Sel", "group": "Autonomous"},
+    {"id": "auto_pt", "label": "Paper Title", "group": "Autonomous"},
+    {"id": "auto_prc", "label": "Redundancy", "group": "Autonomous"},
+)
+
+_ALL_CATEGORIES = _AGGREGATOR_CATEGORIES + _COMPILER_CATEGORIES + _AUTONOMOUS_CATEGORIES
+
+_CATEGORIES_BY_MODE = {
+    "aggregator": _AGGREGATOR_CATEGORIES,
+    "compiler": _COMPILER_CATEGORIES,
+    "autonomous": _AUTONOMOUS_CATEGORIES,
+    "all": _ALL_CATEGORIES,
+}
+
+
+@functools.lru_cache(maxsize=2048)
+def _extract_role_prefix(task_id: str) -> str:
+    """Role prefix of a task ID (memoized - the same IDs are checked on every call)."""
+    # Everything before the last underscore
+    index = task_id.rfind('_')
+    if index == -1:
+        return task_id
+    return task_id[:index]
+
 
 class BoostManager:
     """
@@ -78,6 +124,10 @@ class BoostManager:
         # NEW: Category-based boost mode (role prefixes like "agg_sub1", "comp_hc")
         self.boosted_categories: Set[str] = set()
         
+        # Pending coalesced "boost_next_count_updated" broadcast
+        self._count_broadcast_handle: Optional[asyncio.TimerHandle] = None
+        self._count_broadcast_task: Optional[asyncio.Task] = None
+        
         self._initialized = True
         
         logger.info("BoostManager initialized")
@@ -180,6 +230,8 @@ class BoostManager:
             self.boost_next_count = max(0, count)
             logger.info(f"Boost next count set to {self.boost_next_count}")
             
+            # User-initiated change: broadcast now and drop any pending update
+            self._cancel_count_broadcast()
             await self._broadcast("boost_next_count_updated", {
                 "count": self.boost_next_count
             })
@@ -221,11 +273,7 @@ class BoostManager:
             "comp_hc_005" -> "comp_hc"
             "auto_ts_002" -> "auto_ts"
         """
-        # Split on last underscore and take everything before it
-        parts = task_id.rsplit('_', 1)
-        if len(parts) == 2:
-            return parts[0]
-        return task_id
+        return _extract_role_prefix(task_id)
     
     def should_use_boost(self, task_id: str) -> bool:
         """
@@ -244,37 +292,75 @@ class BoostManager:
             True if task should use boost
         """
         # Must have boost config enabled
-        if not self.boost_config or not self.boost_config.enabled:
+        config = self.boost_config
+        if config is None or not config.enabled:
             return False
         
         # Check boost_next_count first (counter-based mode)
         if self.boost_next_count > 0:
             return True
         
+        # Common case: nothing selected, skip role prefix extraction entirely
+        if not self.boosted_categories and not self.boosted_task_ids:
+            return False
+        
         # Check category boost (role-based mode)
-        role_prefix = self._extract_role_prefix(task_id)
-        if role_prefix in self.boosted_categories:
+        if self.boosted_categories and self._extract_role_prefix(task_id) in self.boosted_categories:
             return True
         
         # Check exact task ID (legacy per-task mode)
-        if task_id in self.boosted_task_ids:
-            return True
-        
-        return False
+        return task_id in self.boosted_task_ids
     
     async def consume_boost_count(self) -> None:
         """
         Decrement the boost_next_count after a boost is used.
         Should be called after a successful boosted API call.
+        
+        Runs without self._lock: the check and decrement contain no await, so
+        they cannot interleave with another coroutine on the event loop.
         """
-        async with self._lock:
-            if self.boost_next_count > 0:
-                self.boost_next_count -= 1
-                logger.debug(f"Boost count consumed, remaining: {self.boost_next_count}")
-                
-                await self._broadcast("boost_next_count_updated", {
-                    "count": self.boost_next_count
-                })
+        if self.boost_next_count <= 0:
+            return
+        
+        self.boost_next_count -= 1
+        remaining = self.boost_next_count
+        logger.debug(f"Boost count consumed, remaining: {remaining}")
+        
+        self._schedule_count_broadcast()
+    
+    def _schedule_count_broadcast(self) -> None:
+        """
+        Coalesce bursts of count updates into a single broadcast.
+        
+        Each call restarts a short timer; when it fires, the current
+        boost_next_count is broadcast once.
+        """
+        self._cancel_count_broadcast()
+        loop = asyncio.get_running_loop()
+        self._count_broadcast_handle = loop.call_later(
+            COUNT_BROADCAST_DELAY_SECONDS, self._start_count_broadcast
+        )
+    
+    def _cancel_count_broadcast(self) -> None:
+        """Cancel a pending coalesced count broadcast, if any."""
+        if self._count_broadcast_handle is not None:
+            self._count_broadcast_handle.cancel()
+            self._count_broadcast_handle = None
+    
+    def _start_count_broadcast(self) -> None:
+        """Timer callback - run the broadcast coroutine on the loop."""
+        self._count_broadcast_handle = None
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._count_broadcast_task = asyncio.ensure_future(self._flush_count_broadcast())
+    
+    async def _flush_count_broadcast(self) -> None:
+        """Broadcast the latest boost_next_count."""
+        try:
+            await self._broadcast("boost_next_count_updated", {
+                "count": self.boost_next_count
+            })
+        except Exception as e:
+            logger.error(f"Failed to broadcast boost count update: {e}")
     
     def get_boost_status(self) -> Dict[str, Any]:
         """
@@ -316,39 +402,10 @@ class BoostManager:
         Returns:
             List of category dicts with id and label
         """
-        categories = []
-        
-        if mode in ("aggregator", "all"):
-            for i in range(1, 11):
-                categories.append({
-                    "id": f"agg_sub{i}",
-                    "label": f"Sub {i}",
-                    "group": "Aggregator"
-                })
-            categories.append({
-                "id": "agg_val",
-                "label": "Validator",
-                "group": "Aggregator"
-            })
+        templates = _CATEGORIES_BY_MODE.get(mode, ())
         
-        if mode in ("compiler", "all"):
-            categories.extend([
-                {"id": "comp_hc", "label": "High-Context", "group": "Compiler"},
-                {"id": "comp_hp", "label": "High-Param", "group": "Compiler"},
-                {"id": "comp_val", "label": "Validator", "group": "Compiler"},
-            ])
-        
-        if mode in ("autonomous", "all"):
-            categories.extend([
-                {"id": "auto_ts", "label": "Topic Sel", "group": "Autonomous"},
-                {"id": "auto_tv", "label": "Topic Val", "group": "Autonomous"},
-                {"id": "auto_cr", "label": "Completion", "group": "Autonomous"},
-                {"id": "auto_rs", "label": "Ref Sel", "group": "Autonomous"},
-                {"id": "auto_pt", "label": "Paper Title", "group": "Autonomous"},
-                {"id": "auto_prc", "label": "Redundancy", "group": "Autonomous"},
-            ])
-        
-        return categories
+        # Return copies - callers annotate each dict (e.g. "boosted" state)
+        return [dict(category) for category in templates]
     
     def is_role_boosted(self, role_prefix: str) -> bool:
         """
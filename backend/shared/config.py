@@ -55,6 +55,9 @@ class RAGConfig(BaseSettings):
     # LM Studio API
     lm_studio_base_url: str = "http://127.0.0.1:1234"
     embedding_model: str = "text-embedding-nomic-embed-text-v1.5"
+    # Tokens-per-minute budgets (0 = unlimited, the default for a local server)
+    lm_studio_completion_tpm_limit: int = 0  # Per completion model
+    lm_studio_embedding_tpm_limit: int = 0  # Per embedding model
     
     # OpenRouter API (Global Configuration)
     # This is the global API key used for per-role OpenRouter model selection
@@ -158,6 +161,7 @@ class SystemConfig(BaseSettings):
     logs_dir: str = "backend/logs"
     user_uploads_dir: str = "backend/data/user_uploads"
     chroma_db_dir: str = "backend/data/chroma_db"
+    lm_studio_model_configs_file: str = "backend/data/lm_studio_model_configs.json"
     
     shared_training_file: str = "backend/data/rag_shared_training.txt"
     compiler_outline_file: str = "backend/data/compiler_outline.txt"
@@ -44,6 +44,16 @@ MAX_CRITIQUES_PER_PAPER = 10
 # Paper type definitions
 PaperType = Literal["autonomous_paper", "final_answer", "compiler_paper"]
 
+# Directories already created by this process (avoids a mkdir syscall per call)
+_ensured_dirs: set = set()
+
+
+def _ensure_dir(directory: str) -> None:
+    """Create directory once per process; later calls are a set lookup."""
+    if directory not in _ensured_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _ensured_dirs.add(directory)
+
 
 def _get_critiques_file_path(
     paper_type: PaperType,
@@ -64,7 +74,7 @@ def _get_critiques_file_path(
     """
     # If base_path is provided, use it for session-aware storage
     if base_path:
-        os.makedirs(base_path, exist_ok=True)
+        _ensure_dir(base_path)
         
         if paper_type == "autonomous_paper":
             if not paper_id:
@@ -89,16 +99,16 @@ def _get_critiques_file_path(
         if not paper_id:
             raise ValueError("paper_id is required for autonomous_paper type")
         papers_dir = os.path.join(data_dir, "auto_papers")
-        os.makedirs(papers_dir, exist_ok=True)
+        _ensure_dir(papers_dir)
         return os.path.join(papers_dir, f"paper_{paper_id}_critiques.json")
     
     elif paper_type == "final_answer":
         final_answer_dir = os.path.join(data_dir, "auto_final_answer")
-        os.makedirs(final_answer_dir, exist_ok=True)
+        _ensure_dir(final_answer_dir)
         return os.path.join(final_answer_dir, "final_answer_critiques.json")
     
     elif paper_type == "compiler_paper":
-        os.makedirs(data_dir, exist_ok=True)
+        _ensure_dir(data_dir)
         return os.path.join(data_dir, "compiler_paper_critiques.json")
     
     else:
@@ -154,8 +164,16 @@ async def save_critique(
             c["date"] = c["date"].isoformat()
     
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(critiques_data, f, indent=2, default=str)
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(critiques_data, f, indent=2, default=str)
+        except FileNotFoundError:
+            # Directory was removed since it was cached (e.g. session cleared)
+            directory = os.path.dirname(file_path)
+            _ensured_dirs.discard(directory)
+            _ensure_dir(directory)
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(critiques_data, f, indent=2, default=str)
         logger.info(f"Saved critique {critique.critique_id} for {paper_type}" + 
                    (f" paper_id={paper_id}" if paper_id else "") +
                    (f" at {file_path}" if base_path else ""))
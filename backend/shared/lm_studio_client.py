@@ -12,18 +12,195 @@ Deterministic generation ensures reproducible results, consistent JSON formattin
 and stable validation decisions across long research sessions.
 """
 import httpx
+import orjson
 import asyncio
+import json
+import random
+import re
+import socket
 import time
 import os
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from backend.shared.config import rag_config
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from backend.shared.config import rag_config, system_config
+from backend.shared.json_parser import sanitize_json_response
+from backend.shared.utils import count_tokens_batch_async
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Ensure logs directory exists
-os.makedirs("backend/logs", exist_ok=True)
+# Request bodies are pre-serialized with orjson (much faster than httpx's stdlib json
+# for large prompts and 100-text embedding batches)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# TCP keepalive probes so idle pooled connections are not silently dropped between
+# bursts. Per-option tuning constants are platform-specific, so only set what exists.
+_TCP_KEEPALIVE_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+for _option_name, _value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+    if hasattr(socket, _option_name):
+        _TCP_KEEPALIVE_OPTIONS.append((socket.IPPROTO_TCP, getattr(socket, _option_name), _value))
+
+# LM Studio 400 error classification
+_MODEL_CRASH_MARKERS = ("has crashed", "exit code:")
+_CONTEXT_LIMIT_RE = re.compile(r'context.*?(\d+)')
+
+# HTTP/2 support in httpx requires the optional 'h2' package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+async def _iter_sse_chunks(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Parse OpenAI-style server-sent events into chunk dicts."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if not data:
+            continue
+        if data == "[DONE]":
+            break
+        try:
+            yield orjson.loads(data)
+        except orjson.JSONDecodeError:
+            logger.warning(f"Skipping malformed stream chunk: {data[:200]}")
+
+
+# Delta fields that are streamed in pieces and must be concatenated
+_STREAM_TEXT_FIELDS = ("content", "reasoning")
+
+
+async def _aggregate_stream(chunks: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Assemble streamed chunks into a non-streaming chat completion response.
+    
+    The text fields of each delta (content, reasoning) are concatenated per
+    choice, and role is taken from the first delta that carries it (LM Studio
+    repeats it in every chunk), so callers see the same shape as a regular
+    /v1/chat/completions reply.
+    """
+    result: Dict[str, Any] = {"object": "chat.completion", "choices": []}
+    parts: Dict[int, Dict[str, List[str]]] = {}
+    roles: Dict[int, str] = {}
+    finish_reasons: Dict[int, Optional[str]] = {}
+    
+    async for chunk in chunks:
+        for key in ("id", "created", "model", "system_fingerprint"):
+            if key in chunk and key not in result:
+                result[key] = chunk[key]
+        if chunk.get("usage"):
+            result["usage"] = chunk["usage"]
+        
+        for choice in chunk.get("choices") or []:
+            index = choice.get("index", 0)
+            fields = parts.setdefault(index, {})
+            delta = choice.get("delta") or {}
+            if delta.get("role") and index not in roles:
+                roles[index] = delta["role"]
+            for field in _STREAM_TEXT_FIELDS:
+                value = delta.get(field)
+                if isinstance(value, str):
+                    fields.setdefault(field, []).append(value)
+            if choice.get("finish_reason"):
+                finish_reasons[index] = choice["finish_reason"]
+    
+    for index in sorted(parts):
+        message = {"role": roles.get(index, "assistant")}
+        message.update((field, "".join(values)) for field, values in parts[index].items())
+        message.setdefault("content", "")
+        result["choices"].append({
+            "index": index,
+            "message": message,
+            "finish_reason": finish_reasons.get(index)
+        })
+    
+    return result
+
+
+def _backoff_delay(
+    attempt: int,
+    response: Optional[httpx.Response] = None,
+    base: float = 1.0,
+    cap: float = 30.0
+) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+    
+    Honors a numeric Retry-After header when the server sends one; otherwise
+    exponential backoff (base * 2^attempt, capped) with up to 0.5s jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(cap, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-date form - fall back to computed backoff
+    return min(cap, base * (2 ** attempt)) + random.random() * 0.5
+
+
+class _TokenRateLimiter:
+    """
+    Rolling 60-second tokens-per-minute budget.
+    
+    acquire() reserves the estimated tokens for a request, sleeping until
+    enough of the window has expired; record() adds usage reported after the
+    request (e.g. completion tokens) so later callers see the real load.
+    """
+    
+    WINDOW_SECONDS = 60.0
+    
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._window: deque = deque()  # (timestamp, tokens)
+        self._used = 0
+    
+    def _prune(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._used -= tokens
+    
+    async def acquire(self, tokens: int) -> None:
+        while True:
+            now = time.monotonic()
+            self._prune(now)
+            # An empty window always admits the request, even if it alone exceeds the budget
+            if not self._window or self._used + tokens <= self.tokens_per_minute:
+                self.record(tokens)
+                return
+            wait = self.WINDOW_SECONDS - (now - self._window[0][0])
+            logger.debug("TPM budget exhausted (%d/%d), waiting %.1fs", self._used, self.tokens_per_minute, wait)
+            await asyncio.sleep(max(wait, 0.01))
+    
+    def record(self, tokens: int) -> None:
+        if tokens > 0:
+            self._window.append((time.monotonic(), tokens))
+            self._used += tokens
+
+
+def _approx_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough prompt size in tokens (~4 chars per token)."""
+    return sum(len(msg.get("content") or "") for msg in messages) // 4
+
+
+def _order_embeddings(items: List[Dict[str, Any]]) -> List[List[float]]:
+    """
+    Extract embeddings in input order from an /v1/embeddings "data" list.
+    
+    Indices are 0..n-1, so each embedding is placed directly at its index (O(n))
+    instead of sorting; the common already-ordered case is a plain comprehension.
+    """
+    if all(item["index"] == i for i, item in enumerate(items)):
+        return [item["embedding"] for item in items]
+    
+    embeddings: List[Optional[List[float]]] = [None] * len(items)
+    for item in items:
+        embeddings[item["index"]] = item["embedding"]
+    return embeddings
 
 
 class LMStudioClient:
@@ -33,28 +210,56 @@ class LMStudioClient:
     EMBEDDING_BATCH_SIZE = 100  # Process embeddings in batches of 100
     EMBEDDING_TIMEOUT = None  # No timeout - continuous runtime
     MAX_RETRIES = 1  # Fail fast when LM Studio unavailable (OpenRouter fallback)
-    RETRY_DELAY = 0.5  # seconds (not used when MAX_RETRIES=1)
+    RETRY_DELAY = 0.5  # Base backoff in seconds, doubled per attempt (not used when MAX_RETRIES=1)
+    
+    EMBEDDING_COALESCE_WINDOW = 0.02  # seconds to collect small concurrent requests
+    
+    # Passed compatibility tests are trusted for this long (persisted across restarts)
+    COMPATIBILITY_CACHE_TTL = 7 * 24 * 3600  # seconds
+    # Only compatibility results are persisted; context_length cached by agents is
+    # session-specific (and per role), so it must not outlive the process
+    PERSISTED_CONFIG_FIELDS = ("compatibility_test_passed", "tested_at", "estimated_context_length")
     
     # Rate limiting semaphores
     _embedding_semaphore = asyncio.Semaphore(2)  # Max 2 concurrent embedding requests
     _model_semaphores: Dict[str, asyncio.Semaphore] = {}  # Per-model semaphores for chat completions
     _semaphore_lock = asyncio.Lock()  # Thread-safe dictionary access
     
+    # Tokens-per-minute limiters, keyed by model (only when a TPM limit is configured)
+    _rate_limiters: Dict[str, _TokenRateLimiter] = {}
+    
     # Model configuration cache
     _model_configs: Dict[str, Dict[str, Any]] = {}
     _config_lock = asyncio.Lock()
     
     def __init__(self, base_url: str = None):
         self.base_url = base_url or rag_config.lm_studio_base_url
+        
+        # Small embedding requests waiting for the next coalesced flush, per model
+        self._pending_embeddings: Dict[str, List[Tuple[List[str], asyncio.Future]]] = {}
+        self._embedding_flush_tasks: Dict[str, asyncio.Task] = {}
+        
+        # Restore compatibility results from previous sessions
+        if not LMStudioClient._model_configs:
+            LMStudioClient._model_configs.update(self._load_model_configs())
         # Optimized HTTP client with connection pooling
-        self.client = httpx.AsyncClient(
-            timeout=None,  # No timeout - continuous runtime
+        # HTTP/2 is only negotiated over TLS (e.g. a remote LM Studio behind an
+        # HTTPS proxy); plain http://localhost stays on HTTP/1.1 keep-alive
+        # (limits/http2 must live on the transport when one is passed explicitly)
+        transport = httpx.AsyncHTTPTransport(
+            http2=_HTTP2_AVAILABLE,
+            retries=1,  # Retry failed connection attempts once
+            socket_options=_TCP_KEEPALIVE_OPTIONS,
             limits=httpx.Limits(
                 max_keepalive_connections=20,  # Connection pool
                 max_connections=50,
-                keepalive_expiry=30.0
+                keepalive_expiry=120.0  # Keep connections warm between bursts
             )
         )
+        self.client = httpx.AsyncClient(
+            timeout=None,  # No timeout - continuous runtime
+            transport=transport
+        )
     
     async def _get_model_semaphore(self, model: str) -> asyncio.Semaphore:
         """
@@ -68,18 +273,32 @@ class LMStudioClient:
         Returns:
             Semaphore for this specific model
         """
+        # Fast path: dict reads are atomic on the event loop, no lock needed
+        semaphore = self._model_semaphores.get(model)
+        if semaphore is not None:
+            return semaphore
+        
         async with self._semaphore_lock:
             if model not in self._model_semaphores:
                 self._model_semaphores[model] = asyncio.Semaphore(1)
-                logger.debug(f"Created semaphore for model: {model}")
+                logger.debug("Created semaphore for model: %s", model)
             return self._model_semaphores[model]
     
+    def _get_rate_limiter(self, model: str, tokens_per_minute: int) -> Optional[_TokenRateLimiter]:
+        """Get or create the TPM limiter for a model; None when limiting is disabled."""
+        if tokens_per_minute <= 0:
+            return None
+        limiter = self._rate_limiters.get(model)
+        if limiter is None:
+            limiter = self._rate_limiters[model] = _TokenRateLimiter(tokens_per_minute)
+        return limiter
+    
     async def list_models(self) -> List[Dict[str, Any]]:
         """List available models from LM Studio."""
         try:
             response = await self.client.get(f"{self.base_url}/v1/models")
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get("data", [])
         except Exception as e:
             logger.error(f"Failed to list models: {e}")
@@ -87,16 +306,42 @@ class LMStudioClient:
     
     async def get_loaded_models(self) -> List[str]:
         """
-        Get list of currently LOADED models with their instance IDs.
+        Get list of currently LOADED models.
         
-        Returns model IDs as they appear at runtime (e.g., 'openai/gpt-oss-20b:2').
         This is different from list_models() which returns downloaded model names.
         
-        Uses 'lms ps' command to get accurate loaded model list with instance IDs.
+        Queries LM Studio's REST API (/api/v0/models) over the pooled HTTP
+        connection. That endpoint reports model IDs without the runtime instance
+        suffix, so several loaded instances of one model appear as a single entry.
+        Falls back to the 'lms ps' command, which does list instance IDs
+        (e.g., 'openai/gpt-oss-20b:2'), on LM Studio versions that do not expose
+        the endpoint (404).
         
         Returns:
-            List of loaded model IDs with instance suffixes
+            List of loaded model IDs
         """
+        try:
+            response = await self.client.get(f"{self.base_url}/api/v0/models", timeout=10.0)
+            if response.status_code == 404:
+                logger.debug("/api/v0/models not available, falling back to 'lms ps'")
+                return await self._get_loaded_models_from_cli()
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            models = [
+                entry["id"]
+                for entry in data.get("data", [])
+                if entry.get("state") == "loaded" and entry.get("id")
+            ]
+            logger.debug("Loaded models from LM Studio API: %s", models)
+            return models
+            
+        except Exception as e:
+            logger.error(f"Failed to get loaded models: {e}")
+            return []
+    
+    async def _get_loaded_models_from_cli(self) -> List[str]:
+        """Get loaded model IDs by parsing 'lms ps' output (legacy LM Studio)."""
         try:
             # Use 'lms ps' to get loaded models with instance IDs (NON-BLOCKING)
             process = await asyncio.create_subprocess_exec(
@@ -134,7 +379,7 @@ class LMStudioClient:
                     if parts:
                         models.append(parts[0])
                 
-                logger.debug(f"Loaded models from 'lms ps': {models}")
+                logger.debug("Loaded models from 'lms ps': %s", models)
                 return models
             else:
                 logger.warning(f"'lms ps' returned code {result_returncode}")
@@ -154,19 +399,25 @@ class LMStudioClient:
         temperature: float = 0.0,  # Default to deterministic generation - evolving context provides diversity
         max_tokens: Optional[int] = None,
         response_format: Optional[Dict[str, str]] = None,
-        skip_semaphore: bool = False
+        skip_semaphore: bool = False,
+        stream: bool = False,
+        context_window: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Generate a completion using LM Studio API with validation and retry.
         
         Args:
             skip_semaphore: If True, skips model semaphore acquisition (for non-blocking operations)
+            stream: If True, receives the response as SSE chunks and assembles them into the
+                    same response dict (avoids buffering the raw body alongside the parsed JSON)
+            context_window: Caller's context window; when given, prompts that cannot fit
+                    it are rejected before sending
         """
         # Get model-specific semaphore (allows different models to run in parallel)
         if skip_semaphore:
             # Direct execution without semaphore
             return await self._execute_completion_request(
-                model, messages, temperature, max_tokens, response_format
+                model, messages, temperature, max_tokens, response_format, stream, context_window
             )
         
         model_semaphore = await self._get_model_semaphore(model)
@@ -174,10 +425,37 @@ class LMStudioClient:
         # ACQUIRE THIS MODEL'S SEMAPHORE to prevent concurrent requests to same model
         async with model_semaphore:
             return await self._execute_completion_request(
-                model, messages, temperature, max_tokens, response_format
+                model, messages, temperature, max_tokens, response_format, stream, context_window
             )
     
-    async def _execute_completion_request(
+    async def stream_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion, yielding content deltas as they arrive.
+        
+        Holds the model semaphore for the lifetime of the stream. No retries -
+        partial output may already have been consumed by the caller.
+        """
+        payload = self._build_completion_payload(
+            model, messages, temperature, max_tokens, response_format
+        )
+        model_semaphore = await self._get_model_semaphore(model)
+        
+        async with model_semaphore:
+            async with self._open_completion_stream(payload) as response:
+                async for chunk in _iter_sse_chunks(response):
+                    for choice in chunk.get("choices") or []:
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield content
+    
+    def _build_completion_payload(
         self,
         model: str,
         messages: List[Dict[str, str]],
@@ -185,11 +463,7 @@ class LMStudioClient:
         max_tokens: Optional[int],
         response_format: Optional[Dict[str, str]]
     ) -> Dict[str, Any]:
-        """Execute the actual completion request (extracted for semaphore bypass)."""
-        # Calculate approximate token count for logging
-        total_chars = sum(len(msg.get("content", "")) for msg in messages)
-        approx_tokens = total_chars // 4  # Rough approximation
-        
+        """Build the chat completions request body."""
         payload = {
             "model": model,
             "messages": messages,
@@ -200,7 +474,7 @@ class LMStudioClient:
         # If not explicitly provided, use a generous default for reasoning models
         if max_tokens is None:
             max_tokens = 25000  # Increased to 25K to accommodate reasoning models with extensive thinking
-            logger.debug(f"Auto-limiting max_tokens to {max_tokens} (25K for reasoning model support)")
+            logger.debug("Auto-limiting max_tokens to %d (25K for reasoning model support)", max_tokens)
         
         payload["max_tokens"] = max_tokens
         
@@ -211,19 +485,106 @@ class LMStudioClient:
         # with certain models (e.g., Grok 4.1). Models will now generate until max_tokens
         # or natural completion. The json_parser handles any trailing garbage/padding.
         
+        return payload
+    
+    async def _check_prompt_fits(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        context_length: Optional[int]
+    ) -> None:
+        """
+        Reject prompts that cannot fit the caller's context window before sending.
+        
+        Saves a round trip plus LM Studio prefill setup that would only end in an
+        input-overflow 400. The window comes from the calling role rather than the
+        per-model config cache, which is shared by every role using the model.
+        Skipped when the caller does not pass one.
+        """
+        if not context_length:
+            return
+        
+        # Prompts are often 100K+ chars - tokenize off the event loop
+        prompt_tokens = sum(await count_tokens_batch_async([msg.get("content") or "" for msg in messages]))
+        if prompt_tokens + max_tokens > context_length:
+            logger.error(
+                f"Input prompt too large! Prompt: {prompt_tokens} tokens + {max_tokens} output tokens, "
+                f"Model context limit: {context_length} tokens. Not sending request."
+            )
+            raise ValueError(
+                f"Prompt ({prompt_tokens} tokens) plus max_tokens ({max_tokens}) exceeds model's "
+                f"context window ({context_length} tokens). In LM Studio: Increase 'Context Length (n_ctx)' "
+                f"to at least {prompt_tokens + max_tokens + 5000} tokens."
+            )
+    
+    @asynccontextmanager
+    async def _open_completion_stream(self, payload: Dict[str, Any]):
+        """Open a streaming chat completion; raises HTTPStatusError on error status."""
+        stream_payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/v1/chat/completions",
+            content=orjson.dumps(stream_payload),
+            headers=_JSON_HEADERS
+        ) as response:
+            if response.is_error:
+                # Read the body so error handlers can inspect response.text
+                await response.aread()
+            response.raise_for_status()
+            yield response
+    
+    async def _execute_completion_request(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        response_format: Optional[Dict[str, str]],
+        stream: bool = False,
+        context_window: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Execute the actual completion request (extracted for semaphore bypass)."""
+        payload = self._build_completion_payload(
+            model, messages, temperature, max_tokens, response_format
+        )
+        
+        await self._check_prompt_fits(messages, payload["max_tokens"], context_window)
+        
+        rate_limiter = self._get_rate_limiter(model, rag_config.lm_studio_completion_tpm_limit)
+        
+        # Approximate prompt tokens - only needed by the rate limiter and error
+        # reporting, so the scan over (possibly 100K-char) messages is skipped otherwise
+        approx_tokens = _approx_message_tokens(messages) if rate_limiter else None
+        
+        if rate_limiter:
+            # Reserved once for the logical request - retries resend the same prompt
+            await rate_limiter.acquire(approx_tokens)
+        
         # Retry logic for transient errors
         max_retries = 2
         for attempt in range(max_retries + 1):
             try:
-                response = await self.client.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    json=payload
-                )
-                response.raise_for_status()
-                return response.json()
+                if stream:
+                    async with self._open_completion_stream(payload) as response:
+                        result = await _aggregate_stream(_iter_sse_chunks(response))
+                else:
+                    response = await self.client.post(
+                        f"{self.base_url}/v1/chat/completions",
+                        content=orjson.dumps(payload),
+                        headers=_JSON_HEADERS
+                    )
+                    response.raise_for_status()
+                    result = orjson.loads(response.content)
+                
+                if rate_limiter:
+                    # Prompt tokens were reserved up front; add what was generated
+                    rate_limiter.record((result.get("usage") or {}).get("completion_tokens", 0))
+                return result
                 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 400:
+                    if approx_tokens is None:
+                        approx_tokens = _approx_message_tokens(messages)
                     error_detail = e.response.text if hasattr(e.response, 'text') else str(e)
                     logger.error(
                         f"LM Studio 400 Bad Request (attempt {attempt + 1}/{max_retries + 1}): "
@@ -231,14 +592,15 @@ class LMStudioClient:
                         f"messages_count={len(messages)}, error={error_detail}"
                     )
                     
-                    # Check error type
-                    is_model_crash = "has crashed" in error_detail.lower() or "exit code:" in error_detail.lower()
-                    is_regex_error = "failed to process regex" in error_detail.lower()
-                    is_input_overflow = ("prompt" in error_detail.lower() and "too" in error_detail.lower()) or \
-                                        ("input" in error_detail.lower() and "exceeds" in error_detail.lower()) or \
-                                        ("prompt exceeds" in error_detail.lower())
-                    is_mid_generation_overflow = "mid-generation" in error_detail.lower() or \
-                                                 ("context length" in error_detail.lower() and "does not support" in error_detail.lower())
+                    # Check error type (lowercase once, reuse for every marker check)
+                    error_lower = error_detail.lower()
+                    is_model_crash = any(marker in error_lower for marker in _MODEL_CRASH_MARKERS)
+                    is_regex_error = "failed to process regex" in error_lower
+                    is_input_overflow = ("prompt" in error_lower and "too" in error_lower) or \
+                                        ("input" in error_lower and "exceeds" in error_lower) or \
+                                        ("prompt exceeds" in error_lower)
+                    is_mid_generation_overflow = "mid-generation" in error_lower or \
+                                                 ("context length" in error_lower and "does not support" in error_lower)
                     
                     if is_model_crash:
                         # Model crashed - LM Studio has unloaded it
@@ -270,8 +632,7 @@ class LMStudioClient:
                         )
                     
                     elif is_input_overflow:
-                        import re
-                        limit_match = re.search(r'context.*?(\d+)', error_detail.lower())
+                        limit_match = _CONTEXT_LIMIT_RE.search(error_lower)
                         context_limit = int(limit_match.group(1)) if limit_match else "unknown"
                         
                         logger.error(
@@ -285,11 +646,20 @@ class LMStudioClient:
                     
                     # Retry on transient 400 errors
                     if attempt < max_retries:
-                        await asyncio.sleep(1.0 * (attempt + 1))
+                        await asyncio.sleep(_backoff_delay(attempt, e.response))
                         logger.info(f"Retrying after 400 error...")
                         continue
                     
                     raise
+                
+                elif e.response.status_code == 429:
+                    if attempt < max_retries:
+                        delay = _backoff_delay(attempt, e.response)
+                        logger.warning(f"LM Studio rate limited model '{model}' (429), retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    logger.error(f"LM Studio rate limited model '{model}' (429) after {max_retries + 1} attempts")
+                    raise
                     
                 elif e.response.status_code == 404:
                     logger.error(f"Model '{model}' not found (404). Please ensure it is loaded in LM Studio.")
@@ -301,7 +671,7 @@ class LMStudioClient:
             except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError) as e:
                 logger.error(f"Connection error for model '{model}': {e}")
                 if attempt < max_retries:
-                    await asyncio.sleep(1.0 * (attempt + 1))
+                    await asyncio.sleep(_backoff_delay(attempt))
                     continue
                 raise
                     
@@ -314,54 +684,114 @@ class LMStudioClient:
     async def get_embeddings(self, texts: List[str], model: str = None) -> List[List[float]]:
         """
         Get embeddings using LM Studio API with rate limiting.
-        Optimized with batching, retry logic, and performance metrics.
+        Optimized with concurrent batching, retry logic, and performance metrics.
+        
+        Requests smaller than one batch are coalesced with other concurrent
+        callers for EMBEDDING_COALESCE_WINDOW seconds and sent as one request.
         """
         if not texts:
             return []
         
-        # ACQUIRE SEMAPHORE for rate limiting
-        async with self._embedding_semaphore:
-            embedding_model = model or rag_config.embedding_model
-            start_time = time.time()
+        embedding_model = model or rag_config.embedding_model
+        start_time = time.time()
+        
+        try:
+            if len(texts) < self.EMBEDDING_BATCH_SIZE:
+                all_embeddings = await self._enqueue_embeddings(texts, embedding_model)
+            else:
+                all_embeddings = await self._embed_in_batches(texts, embedding_model)
             
-            try:
-                # Process in batches to avoid timeouts and improve throughput
-                all_embeddings = []
-                total_batches = (len(texts) + self.EMBEDDING_BATCH_SIZE - 1) // self.EMBEDDING_BATCH_SIZE
-                
-                for batch_idx in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
-                    batch_texts = texts[batch_idx:batch_idx + self.EMBEDDING_BATCH_SIZE]
-                    batch_num = batch_idx // self.EMBEDDING_BATCH_SIZE + 1
-                    
-                    logger.debug(
-                        f"Embedding batch {batch_num}/{total_batches} "
-                        f"({len(batch_texts)} texts)"
-                    )
-                    
-                    # Retry logic for transient failures
-                    batch_embeddings = await self._get_embeddings_with_retry(
-                        batch_texts, 
-                        embedding_model
-                    )
-                    all_embeddings.extend(batch_embeddings)
-                
-                elapsed = time.time() - start_time
-                texts_per_sec = len(texts) / elapsed if elapsed > 0 else 0
-                
-                logger.debug(
-                    f"Embeddings complete: {len(texts)} texts in {elapsed:.2f}s "
-                    f"({texts_per_sec:.1f} texts/sec, {total_batches} batches)"
-                )
-                
-                return all_embeddings
-                
-            except Exception as e:
-                elapsed = time.time() - start_time
-                logger.error(
-                    f"Failed to get embeddings after {elapsed:.2f}s "
-                    f"({len(texts)} texts): {e}"
-                )
-                raise
+            elapsed = time.time() - start_time
+            texts_per_sec = len(texts) / elapsed if elapsed > 0 else 0
+            
+            logger.debug(
+                "Embeddings complete: %d texts in %.2fs (%.1f texts/sec)",
+                len(texts), elapsed, texts_per_sec
+            )
+            
+            return all_embeddings
+            
+        except Exception as e:
+            elapsed = time.time() - start_time
+            logger.error(
+                f"Failed to get embeddings after {elapsed:.2f}s "
+                f"({len(texts)} texts): {e}"
+            )
+            raise
+    
+    async def _embed_in_batches(self, texts: List[str], model: str) -> List[List[float]]:
+        """Split texts into batches, request them concurrently, and flatten in order."""
+        # Process in batches to avoid timeouts and improve throughput
+        batches = [
+            texts[batch_idx:batch_idx + self.EMBEDDING_BATCH_SIZE]
+            for batch_idx in range(0, len(texts), self.EMBEDDING_BATCH_SIZE)
+        ]
+        
+        logger.debug(
+            "Embedding %d texts in %d batches (batch size %d)",
+            len(texts), len(batches), self.EMBEDDING_BATCH_SIZE
+        )
+        
+        # Dispatch all batches at once - the embedding semaphore inside
+        # _get_embeddings_with_retry limits how many run concurrently
+        batch_results = await asyncio.gather(*[
+            self._get_embeddings_with_retry(batch_texts, model)
+            for batch_texts in batches
+        ])
+        
+        # gather preserves input order, so flattening keeps texts aligned
+        all_embeddings = []
+        for batch_embeddings in batch_results:
+            all_embeddings.extend(batch_embeddings)
+        return all_embeddings
+    
+    async def _enqueue_embeddings(self, texts: List[str], model: str) -> List[List[float]]:
+        """Queue a small request for the model's next coalesced flush and await its slice."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending_embeddings.setdefault(model, []).append((texts, future))
+        
+        if model not in self._embedding_flush_tasks:
+            self._embedding_flush_tasks[model] = asyncio.create_task(
+                self._flush_embedding_queue(model)
+            )
+        
+        return await future
+    
+    async def _flush_embedding_queue(self, model: str) -> None:
+        """After the coalescing window, embed all queued texts and fan results back out."""
+        pending: List[Tuple[List[str], asyncio.Future]] = []
+        try:
+            await asyncio.sleep(self.EMBEDDING_COALESCE_WINDOW)
+            
+            # Requests arriving from here on start a new window
+            self._embedding_flush_tasks.pop(model, None)
+            pending = self._pending_embeddings.pop(model, [])
+            if not pending:
+                return
+            
+            combined = [text for texts, _ in pending for text in texts]
+            if len(pending) > 1:
+                logger.debug("Coalesced %d embedding requests into %d texts", len(pending), len(combined))
+            
+            embeddings = await self._embed_in_batches(combined, model)
+            
+        except asyncio.CancelledError:
+            self._embedding_flush_tasks.pop(model, None)
+            pending = pending or self._pending_embeddings.pop(model, [])
+            for _, future in pending:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        offset = 0
+        for texts, future in pending:
+            if not future.done():
+                future.set_result(embeddings[offset:offset + len(texts)])
+            offset += len(texts)
     
     async def _get_embeddings_with_retry(
         self, 
@@ -369,6 +799,22 @@ class LMStudioClient:
         model: str
     ) -> List[List[float]]:
         """Get embeddings with retry logic for transient failures."""
+        # Wait for this model's TPM budget before taking the semaphore, so a
+        # throttled model doesn't hold a slot other models' embeddings need
+        rate_limiter = self._get_rate_limiter(model, rag_config.lm_studio_embedding_tpm_limit)
+        if rate_limiter:
+            await rate_limiter.acquire(sum(len(text) for text in texts) // 4)
+        
+        # ACQUIRE SEMAPHORE for rate limiting (per batch request)
+        async with self._embedding_semaphore:
+            return await self._request_embeddings(texts, model)
+    
+    async def _request_embeddings(
+        self, 
+        texts: List[str], 
+        model: str
+    ) -> List[List[float]]:
+        """Send one embeddings request, retrying transient failures."""
         for attempt in range(1, self.MAX_RETRIES + 1):
             try:
                 payload = {
@@ -378,25 +824,26 @@ class LMStudioClient:
                 
                 response = await self.client.post(
                     f"{self.base_url}/v1/embeddings",
-                    json=payload
+                    content=orjson.dumps(payload),
+                    headers=_JSON_HEADERS
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
-                # Extract embeddings in order
-                embeddings = [
-                    item["embedding"] 
-                    for item in sorted(data["data"], key=lambda x: x["index"])
-                ]
-                return embeddings
+                return _order_embeddings(data["data"])
                 
             except (httpx.TimeoutException, httpx.NetworkError, httpx.HTTPStatusError) as e:
                 if attempt < self.MAX_RETRIES:
+                    delay = _backoff_delay(
+                        attempt - 1,
+                        e.response if isinstance(e, httpx.HTTPStatusError) else None,
+                        base=self.RETRY_DELAY
+                    )
                     logger.warning(
                         f"Embedding attempt {attempt}/{self.MAX_RETRIES} failed: {e}. "
-                        f"Retrying in {self.RETRY_DELAY}s..."
+                        f"Retrying in {delay:.1f}s..."
                     )
-                    await asyncio.sleep(self.RETRY_DELAY)
+                    await asyncio.sleep(delay)
                 else:
                     logger.error(
                         f"Embedding failed after {self.MAX_RETRIES} attempts: {e}"
@@ -481,6 +928,20 @@ class LMStudioClient:
         Returns:
             Tuple of (is_compatible, error_message, details)
         """
+        cached = self._get_recent_compatibility_result(model_name)
+        # A cached pass only counts while LM Studio is up and has the model loaded
+        # (the 'lms ps' fallback reports instance IDs such as 'model:2')
+        if cached and any(
+            loaded == model_name or loaded.startswith(f"{model_name}:")
+            for loaded in await self.get_loaded_models()
+        ):
+            logger.info(f"Model '{model_name}' passed compatibility test at {cached['tested_at']} (cached)")
+            return (True, "", {
+                "model_name": model_name,
+                "cached": True,
+                "tested_at": cached["tested_at"]
+            })
+        
         try:
             test_prompt = 'Output JSON: {"status": "ok", "test": "Model is compatible"}'
             
@@ -521,11 +982,12 @@ class LMStudioClient:
             
             # Check 3: MUST parse as JSON (CRITICAL for ASI system)
             try:
-                import json
-                from backend.shared.json_parser import sanitize_json_response
-                
-                sanitized_content = sanitize_json_response(content)
-                parsed_json = json.loads(sanitized_content)
+                try:
+                    # Fast path: most models emit clean JSON
+                    parsed_json = orjson.loads(content)
+                except orjson.JSONDecodeError:
+                    # Strip think tags, markdown fences, etc. and retry
+                    parsed_json = json.loads(sanitize_json_response(content))
                 logger.info(f"Model '{model_name}' produced valid JSON: {parsed_json}")
             except json.JSONDecodeError as json_err:
                 error = f"Model '{model_name}' FAILED to produce valid JSON: {json_err}"
@@ -539,7 +1001,9 @@ class LMStudioClient:
             
             model_config = {
                 "model_path": model_name,
-                "context_length": estimated_context,
+                # Guess only - kept apart from context_length, which holds the
+                # session's user-configured window (set by agents, never persisted)
+                "estimated_context_length": estimated_context,
                 "compatibility_test_passed": True,
                 "tested_at": datetime.now().isoformat()
             }
@@ -571,12 +1035,81 @@ class LMStudioClient:
             config: Configuration dict (context_length, etc.)
         """
         async with self._config_lock:
-            self._model_configs[model_id] = {
+            previous = self._model_configs.get(model_id, {})
+            # Merge so agents caching context_length keep an earlier compatibility result
+            updated = {
+                **previous,
                 "model_id": model_id,
                 "cached_at": datetime.now().isoformat(),
                 **config
             }
-            logger.debug(f"Cached config for model '{model_id}'")
+            self._model_configs[model_id] = updated
+            logger.debug("Cached config for model '%s'", model_id)
+            
+            # Only touch disk when a persisted field changed - agents re-cache
+            # context_length after every successful call
+            if self._persisted_fields(previous) != self._persisted_fields(updated):
+                self._save_model_configs()
+    
+    def _get_recent_compatibility_result(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached config if the model passed a compatibility test within the TTL."""
+        config = self._model_configs.get(model_id)
+        if not config or not config.get("compatibility_test_passed") or not config.get("tested_at"):
+            return None
+        
+        try:
+            tested_at = datetime.fromisoformat(config["tested_at"])
+        except (TypeError, ValueError):
+            return None
+        
+        if (datetime.now() - tested_at).total_seconds() > self.COMPATIBILITY_CACHE_TTL:
+            return None
+        return config
+    
+    @classmethod
+    def _persisted_fields(cls, config: Dict[str, Any]) -> Dict[str, Any]:
+        """The subset of a model config that is written to disk."""
+        return {k: config[k] for k in cls.PERSISTED_CONFIG_FIELDS if k in config}
+    
+    @classmethod
+    def _load_model_configs(cls) -> Dict[str, Dict[str, Any]]:
+        """Load persisted model configs; missing or corrupt file yields an empty cache."""
+        path = system_config.lm_studio_model_configs_file
+        if not os.path.exists(path):
+            return {}
+        
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load model configs from {path}: {e}")
+            return {}
+        
+        if not isinstance(data, dict):
+            return {}
+        # Drop anything beyond the compatibility fields (files from older versions
+        # also stored a previous session's context_length)
+        configs = {}
+        for model_id, config in data.items():
+            persisted = cls._persisted_fields(config) if isinstance(config, dict) else {}
+            if persisted:
+                configs[model_id] = {"model_id": model_id, **persisted}
+        return configs
+    
+    def _save_model_configs(self) -> None:
+        """Persist model compatibility results (caller holds _config_lock)."""
+        path = system_config.lm_studio_model_configs_file
+        persisted = {}
+        for model_id, config in self._model_configs.items():
+            fields = self._persisted_fields(config)
+            if fields:
+                persisted[model_id] = fields
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(persisted, f, indent=2, default=str)
+        except OSError as e:
+            logger.warning(f"Failed to save model configs to {path}: {e}")
     
     async def get_cached_config(self, model_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -588,8 +1121,8 @@ class LMStudioClient:
         Returns:
             Cached config dict or None
         """
-        async with self._config_lock:
-            return self._model_configs.get(model_id)
+        # Single dict read - atomic on the event loop, so no lock is needed
+        return self._model_configs.get(model_id)
     
     async def close(self):
         """Close the HTTP client and cleanup resources."""
@@ -602,3 +1135,8 @@ class LMStudioClient:
 
 # Global client instance
 lm_studio_client = LMStudioClient()
+
+
+async def shutdown_client() -> None:
+    """Close the shared client's connection pool (call once on application shutdown)."""
+    await lm_studio_client.close()
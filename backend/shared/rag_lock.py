@@ -3,6 +3,9 @@ Global RAG operation lock to prevent collisions between Aggregator and Compiler.
 """
 import asyncio
 import logging
+import time
+from collections import deque
+from contextvars import ContextVar
 
 logger = logging.getLogger(__name__)
 
@@ -12,33 +15,77 @@ class RAGOperationLock:
     Async reentrant lock for RAG operations that modify ChromaDB or call embedding API.
     Ensures only one mode (Aggregator or Compiler) performs heavy RAG operations at a time.
     Supports nested acquisition by the same task (reentrant).
+    
+    Reentrancy is tracked with a ContextVar depth counter plus the owning task:
+    coroutines awaited by the holder share its context, so nested acquisitions
+    see depth > 0. Tasks spawned while the lock is held inherit a copy of that
+    context, so the depth only counts when the current task is also the owner.
+    
+    Waiters queue in FIFO order, each on its own asyncio.Event; release hands the
+    lock directly to the next waiter. Queue depth and hold time are logged so
+    long-running holders (e.g. a big Aggregator embedding phase) are visible.
     """
     
+    # Holds longer than this are logged at INFO instead of DEBUG
+    LONG_HOLD_SECONDS = 30.0
+    
     def __init__(self):
-        self._lock = asyncio.Lock()
+        self._locked = False
+        self._waiters: deque = deque()  # (operation_name, asyncio.Event, task)
         self._current_holder = None
-        self._current_task = None
-        self._acquisition_count = 0
+        self._acquired_at = 0.0
+        self._owner = None  # Task holding the lock
+        self._depth: ContextVar = ContextVar(f"rag_lock_depth_{id(self)}", default=0)
+    
+    @property
+    def current_holder(self):
+        """Operation name currently holding the lock (None if free)."""
+        return self._current_holder
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of operations waiting for the lock."""
+        return len(self._waiters)
     
     async def acquire(self, operation_name: str):
         """
         Acquire lock for RAG operation.
         Supports reentrant acquisition - same task can acquire multiple times.
         """
-        current_task = asyncio.current_task()
+        depth = self._held_depth()
         
-        # Check if current task already holds the lock (reentrant)
-        if self._current_task == current_task and self._acquisition_count > 0:
-            self._acquisition_count += 1
-            logger.debug(f"RAG lock reentrant acquisition by: {operation_name} (count={self._acquisition_count})")
+        # Current task already holds the lock (reentrant)
+        if depth > 0:
+            self._depth.set(depth + 1)
+            logger.debug(f"RAG lock reentrant acquisition by: {operation_name} (count={depth + 1})")
             return
         
-        # Otherwise, acquire lock normally
-        logger.debug(f"RAG lock requested by: {operation_name}")
-        await self._lock.acquire()
-        self._current_holder = operation_name
-        self._current_task = current_task
-        self._acquisition_count = 1
+        # Fast path: lock is free and nobody is queued ahead of us
+        if not self._locked and not self._waiters:
+            self._take(operation_name)
+            return
+        
+        # Otherwise, queue behind the current holder and earlier waiters
+        event = asyncio.Event()
+        waiter = (operation_name, event, asyncio.current_task())
+        self._waiters.append(waiter)
+        logger.debug(
+            f"RAG lock requested by: {operation_name} "
+            f"(held by: {self._current_holder}, queue depth={len(self._waiters)})"
+        )
+        
+        try:
+            await event.wait()
+        except asyncio.CancelledError:
+            if event.is_set():
+                # Lock was handed to us as we were cancelled - pass it on
+                self._hand_off()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        
+        # release() already marked us as holder when it set our event
+        self._depth.set(1)
         logger.debug(f"RAG lock acquired by: {operation_name}")
     
     def release(self):
@@ -46,19 +93,53 @@ class RAGOperationLock:
         Release lock.
         Only fully releases when acquisition count reaches 0 (handles reentrant acquisitions).
         """
-        if self._acquisition_count <= 0:
+        depth = self._held_depth()
+        if depth <= 0:
             logger.warning("Attempted to release RAG lock when not held")
             return
         
-        self._acquisition_count -= 1
+        depth -= 1
+        self._depth.set(depth)
         
-        if self._acquisition_count == 0:
-            logger.debug(f"RAG lock released by: {self._current_holder}")
-            self._current_holder = None
-            self._current_task = None
-            self._lock.release()
+        if depth == 0:
+            held_for = time.monotonic() - self._acquired_at
+            log = logger.info if held_for >= self.LONG_HOLD_SECONDS else logger.debug
+            log(
+                f"RAG lock released by: {self._current_holder} "
+                f"(held {held_for:.2f}s, {len(self._waiters)} waiting)"
+            )
+            self._hand_off()
         else:
-            logger.debug(f"RAG lock reentrant release (count={self._acquisition_count})")
+            logger.debug(f"RAG lock reentrant release (count={depth})")
+    
+    def _held_depth(self) -> int:
+        """Reentrancy depth of the current task (0 if it does not hold the lock)."""
+        if self._owner is None or self._owner is not asyncio.current_task():
+            return 0
+        return self._depth.get()
+    
+    def _take(self, operation_name: str):
+        """Mark the lock as held by operation_name."""
+        self._locked = True
+        self._current_holder = operation_name
+        self._owner = asyncio.current_task()
+        self._acquired_at = time.monotonic()
+        self._depth.set(1)
+        logger.debug(f"RAG lock acquired by: {operation_name}")
+    
+    def _hand_off(self):
+        """Give the lock to the next waiter in FIFO order, or mark it free."""
+        if self._waiters:
+            operation_name, event, task = self._waiters.popleft()
+            self._locked = True
+            self._current_holder = operation_name
+            self._owner = task
+            self._acquired_at = time.monotonic()
+            event.set()
+        else:
+            self._locked = False
+            self._current_holder = None
+            self._owner = None
     
     async def __aenter__(self):
         await self.acquire("context_manager")
@@ -70,4 +151,3 @@ class RAGOperationLock:
 
 # Global instance
 rag_operation_lock = RAGOperationLock()
-
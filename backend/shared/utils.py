@@ -1,23 +1,124 @@
 """
 Common utility functions for the ASI Aggregator System.
 """
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import itertools
+import os
+import numpy as np
 import tiktoken
 import re
-from typing import List
+from typing import Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns (avoids the re module's cache lookup on every call)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_CITATION_RE = re.compile(r'\[E(\d+)\]')
+# Redundant filler words/phrases fused into one alternation: one scan instead of three
+_REDUNDANT_PHRASE_RE = re.compile(
+    r'\b(?:very|really|quite|rather|actually|basically|literally'
+    r'|in order to|due to the fact that)\b',
+    re.IGNORECASE
+)
+
+# Byte-level sentence splitting: terminators (. ! ?) and the characters \s matches
+_SENTENCE_TERMINATORS = np.zeros(256, dtype=bool)
+_SENTENCE_TERMINATORS[[ord('.'), ord('!'), ord('?')]] = True
+_WHITESPACE_BYTES = np.array([chr(b).isspace() for b in range(256)], dtype=bool)
+# Below this length the regex split is cheaper than setting up the numpy arrays
+_VECTORIZED_SPLIT_MIN_CHARS = 2048
+
+# Texts up to this length have their token counts memoized
+_TOKEN_COUNT_CACHE_MAX_CHARS = 8192
+
+# Shared pool for tokenizing off the event loop (tiktoken releases the GIL while encoding)
+_TOKENIZE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 4),
+    thread_name_prefix="tok"
+)
+
+# Encodings whose tiktoken failure has already been logged (warn once, not per call)
+_TOKEN_FALLBACK_WARNED: set = set()
+
+# count_tokens_batch counts smaller batches inline (pool hand-off costs more than it saves)
+_PARALLEL_BATCH_MIN_TEXTS = 8
+
+# Loaded tiktoken encodings by name (get_encoding does a registry lookup per call)
+_ENCODING_CACHE: Dict[str, tiktoken.Encoding] = {}
+
+
+def _get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """Return the tiktoken encoding, loading it on first use."""
+    encoding = _ENCODING_CACHE.get(encoding_name)
+    if encoding is None:
+        encoding = _ENCODING_CACHE[encoding_name] = tiktoken.get_encoding(encoding_name)
+    return encoding
+
+
+def _approximate_token_count(text: str, encoding_name: str, error: Exception) -> int:
+    """Fallback estimate when tiktoken fails: ~4 UTF-8 bytes per token."""
+    if encoding_name not in _TOKEN_FALLBACK_WARNED:
+        _TOKEN_FALLBACK_WARNED.add(encoding_name)
+        logger.warning(f"Failed to count tokens with {encoding_name}: {error}. Using approximation.")
+    if not text:
+        return 0
+    # UTF-8 bytes track cl100k_base far better than characters for non-ASCII text
+    return max(1, len(text.encode('utf-8', errors='ignore')) // 4)
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_token_count(text: str, encoding_name: str) -> int:
+    return len(_get_encoding(encoding_name).encode(text))
+
 
 def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
-    """Count tokens in text using tiktoken."""
+    """
+    Count tokens in text using tiktoken.
+    
+    Short texts (system prompts, templates, outlines) are recounted often, so
+    their counts are memoized; long texts are encoded directly to bound memory.
+    """
     try:
-        encoding = tiktoken.get_encoding(encoding_name)
-        return len(encoding.encode(text))
+        if len(text) <= _TOKEN_COUNT_CACHE_MAX_CHARS:
+            return _cached_token_count(text, encoding_name)
+        return len(_get_encoding(encoding_name).encode(text))
     except Exception as e:
-        logger.warning(f"Failed to count tokens: {e}. Using approximation.")
-        # Fallback: approximate 1 token ≈ 4 characters
-        return len(text) // 4
+        return _approximate_token_count(text, encoding_name, e)
+
+
+def count_tokens_batch(texts: List[str], encoding_name: str = "cl100k_base") -> List[int]:
+    """
+    Count tokens for many texts.
+    
+    Large batches are spread over the shared tokenizer pool (tiktoken releases the
+    GIL while encoding); small ones are counted inline. Each text goes through
+    count_tokens, so short texts hit its memo and a text that fails to encode
+    falls back to the estimate on its own.
+    """
+    if len(texts) < _PARALLEL_BATCH_MIN_TEXTS:
+        return [count_tokens(text, encoding_name) for text in texts]
+    return list(_TOKENIZE_EXECUTOR.map(count_tokens, texts, itertools.repeat(encoding_name)))
+
+
+async def count_tokens_async(text: str, encoding_name: str = "cl100k_base") -> int:
+    """Count tokens on the shared tokenizer pool so large texts don't block the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_TOKENIZE_EXECUTOR, count_tokens, text, encoding_name)
+
+
+async def count_tokens_batch_async(texts: List[str], encoding_name: str = "cl100k_base") -> List[int]:
+    """Async variant of count_tokens_batch: every text is counted on the shared tokenizer pool."""
+    # Submitted per text rather than running count_tokens_batch on the pool, which
+    # would have pool workers blocking on tasks queued to the same pool
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(_TOKENIZE_EXECUTOR, count_tokens, text, encoding_name)
+        for text in texts
+    )))
 
 
 def compress_text(text: str, preserve_entities: bool = True) -> str:
@@ -27,21 +128,16 @@ def compress_text(text: str, preserve_entities: bool = True) -> str:
     if not text:
         return text
     
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    # Remove excessive whitespace (str.split collapses the same characters as \s+,
+    # in a C loop instead of the regex engine)
+    text = ' '.join(text.split())
     
     # Remove redundant phrases (if not preserving all content)
     if not preserve_entities:
-        redundant_patterns = [
-            r'\b(very|really|quite|rather|actually|basically|literally)\b',
-            r'\b(in order to)\b',
-            r'\b(due to the fact that)\b',
-        ]
-        for pattern in redundant_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    
-    # Clean up spacing again
-    text = re.sub(r'\s+', ' ', text).strip()
+        text = _REDUNDANT_PHRASE_RE.sub('', text)
+        
+        # Clean up spacing again (only removals can leave gaps behind)
+        text = ' '.join(text.split())
     
     return text
 
@@ -49,15 +145,21 @@ def compress_text(text: str, preserve_entities: bool = True) -> str:
 def split_into_sentences(text: str) -> List[str]:
     """Split text into sentences for semantic chunking."""
     # Simple sentence splitter (can be enhanced with NLTK/spaCy)
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    if len(text) >= _VECTORIZED_SPLIT_MIN_CHARS and text.isascii():
+        # ASCII: byte offsets equal string offsets, so find every terminator
+        # followed by whitespace in one vectorized pass and slice the text there
+        buf = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        boundaries = _SENTENCE_TERMINATORS[buf[:-1]] & _WHITESPACE_BYTES[buf[1:]]
+        cuts = (np.flatnonzero(boundaries) + 1).tolist()
+        sentences = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+    else:
+        sentences = _SENTENCE_SPLIT_RE.split(text)
     return [s.strip() for s in sentences if s.strip()]
 
 
 def extract_citations(text: str) -> List[int]:
     """Extract [E#] citation markers from text."""
-    pattern = r'\[E(\d+)\]'
-    matches = re.findall(pattern, text)
-    return [int(m) for m in matches]
+    return [int(m) for m in _CITATION_RE.findall(text)]
 
 
 def truncate_with_ellipsis(text: str, max_chars: int) -> str:
@@ -69,10 +171,19 @@ def truncate_with_ellipsis(text: str, max_chars: int) -> str:
 
 def normalize_whitespace(text: str) -> str:
     """Normalize whitespace in text."""
-    return re.sub(r'\s+', ' ', text).strip()
+    return ' '.join(text.split())
 
 
-def generate_chunk_id(source_file: str, position: int, chunk_size: int) -> str:
-    """Generate a unique chunk ID."""
-    return f"{source_file}::{position}::{chunk_size}"
+def generate_chunk_id(source_file: str, position: int, chunk_size: int, short: bool = True) -> str:
+    """
+    Generate a unique chunk ID.
+    
+    By default this is a fixed-length 96-bit blake2b digest of the readable
+    "source_file::position::chunk_size" form, so long source paths don't bloat
+    ChromaDB ids and in-memory chunk maps. Pass short=False for the readable form.
+    """
+    readable = f"{source_file}::{position}::{chunk_size}"
+    if not short:
+        return readable
+    return hashlib.blake2b(readable.encode('utf-8'), digest_size=12).hexdigest()
 
@@ -2,14 +2,120 @@
 Workflow Predictor - Predicts next 20 API calls based on current workflow state.
 Supports Aggregator, Compiler, and Autonomous Research modes.
 """
+import functools
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from backend.shared.models import WorkflowTask
 
 logger = logging.getLogger(__name__)
 
 
+# Compiler construction cycle as (role, mode, task_id template):
+# HC(const) → V → HC(const) → V → HC(const) → V → HC(const) → V →
+# HC(outline) → V → HC(review) → V → HC(review) → V → HP(rigor) → V
+_CONSTRUCTION_CYCLE = (
+    ("High-Context", "Construction", "comp_hc_%03d"),
+    ("Validator", "Construction Review", "comp_val_%03d"),
+    ("High-Context", "Construction", "comp_hc_%03d"),
+    ("Validator", "Construction Review", "comp_val_%03d"),
+    ("High-Context", "Construction", "comp_hc_%03d"),
+    ("Validator", "Construction Review", "comp_val_%03d"),
+    ("High-Context", "Construction", "comp_hc_%03d"),
+    ("Validator", "Construction Review", "comp_val_%03d"),
+    ("High-Context", "Outline Update", "comp_hc_%03d"),
+    ("Validator", "Outline Review", "comp_val_%03d"),
+    ("High-Context", "Paper Review", "comp_hc_%03d"),
+    ("Validator", "Review Validation", "comp_val_%03d"),
+    ("High-Context", "Paper Review", "comp_hc_%03d"),
+    ("Validator", "Review Validation", "comp_val_%03d"),
+    ("High-Param", "Rigor Enhancement", "comp_hp_%03d"),
+    ("Validator", "Rigor Review", "comp_val_%03d"),
+)
+
+# Topic selection cycle as (role, mode, task_id template)
+_TOPIC_CYCLE = (
+    ("Topic Selector", "Topic Selection", "auto_ts_%03d"),
+    ("Topic Validator", "Topic Validation", "auto_tv_%03d"),
+)
+
+
+# Predictions are requested on every workflow event with the same shape and only
+# the sequence counters moving, so the role/mode/task_id layout of the 20 tasks
+# is computed once per shape and rebased onto the counters by the public methods.
+
+@functools.lru_cache(maxsize=64)
+def _aggregator_structure(num_submitters: int) -> Tuple[Tuple[str, str, int], ...]:
+    """(role, task_id template, submitter_id) per task; submitter_id 0 is the validator."""
+    # Both modes emit the same order: S1 → S2 → S3 → V → S1 → S2 → ...
+    # (single-model runs submitters sequentially, multi-model runs them in
+    # parallel before the validator; the predicted call order is identical)
+    cycle_length = num_submitters + 1  # submitters + validator
+    structure = []
+    
+    # Role strings and task_id templates are built once per cached shape, for any count
+    submitter_roles = {
+        i: f"Submitter {i}" + (" (Main Submitter)" if i == 1 else "")
+        for i in range(1, num_submitters + 1)
+    }
+    task_id_tmpls = {i: f"agg_sub{i}_%03d" for i in range(1, num_submitters + 1)}
+    
+    for i in range(20):
+        position_in_cycle = i % cycle_length
+        
+        if position_in_cycle < num_submitters:
+            # Submitter turn
+            submitter_id = position_in_cycle + 1
+            structure.append((submitter_roles[submitter_id], task_id_tmpls[submitter_id], submitter_id))
+        else:
+            # Validator turn (after all submitters)
+            structure.append(("Validator", "agg_val_%03d", 0))
+    
+    return tuple(structure)
+
+
+@functools.lru_cache(maxsize=4)
+def _compiler_structure(outline_accepted: bool) -> Tuple[Tuple[str, str, str], ...]:
+    """(role, mode, task_id template) per task for the compiler phase."""
+    structure = []
+    
+    if not outline_accepted:
+        # Outline creation phase (iterative): HC → V → HC → V (max 15 iterations)
+        # (15 iterations max = 30 tasks, so 20 predictions never reach the cap)
+        for i in range(20):
+            if i % 2 == 0:
+                structure.append(("High-Context", "Outline Creation", "comp_hc_outline_%03d"))
+            else:
+                structure.append(("Validator", "Outline Review", "comp_val_outline_%03d"))
+    else:
+        # Paper construction phase - Construction cycle pattern (_CONSTRUCTION_CYCLE)
+        for i in range(20):
+            structure.append(_CONSTRUCTION_CYCLE[i % len(_CONSTRUCTION_CYCLE)])
+    
+    return tuple(structure)
+
+
+# Topic selection never changes shape
+_TOPIC_STRUCTURE = tuple(_TOPIC_CYCLE[i % len(_TOPIC_CYCLE)] for i in range(20))
+
+
+def _build_tasks(
+    structure: Tuple[Tuple[str, str, str], ...],
+    current_sequence: int
+) -> List[WorkflowTask]:
+    """Rebase a (role, mode, task_id template) structure onto current_sequence."""
+    return [
+        WorkflowTask(
+            task_id=task_id_tmpl % (current_sequence + i),
+            sequence_number=current_sequence + i + 1,
+            role=role,
+            mode=mode,
+            provider="lm_studio"
+        )
+        for i, (role, mode, task_id_tmpl) in enumerate(structure)
+    ]
+
+
 class WorkflowPredictor:
     """Predicts upcoming API calls based on workflow state."""
     
@@ -34,79 +140,35 @@ class WorkflowPredictor:
         Returns:
             List of 20 predicted workflow tasks
         """
-        tasks = []
-        display_seq = current_sequence
+        structure = _aggregator_structure(num_submitters)
+        tasks = [None] * len(structure)  # Filled by index, no list regrowth
         
-        # Initialize per-role sequence counters
+        # Initialize per-role sequence counters as a list indexed by submitter_id - 1
+        # (also a copy, so the caller's dict is never modified)
         if submitter_sequences is None:
-            submitter_sequences = {i: 0 for i in range(1, num_submitters + 1)}
+            sub_seqs = [0] * num_submitters
         else:
-            # Make a copy to avoid modifying the original
-            submitter_sequences = dict(submitter_sequences)
+            sub_seqs = [submitter_sequences.get(i, 0) for i in range(1, num_submitters + 1)]
         
         # Make a copy of validator sequence
         val_seq = validator_sequence
         
-        if single_model_mode:
-            # Sequential mode: S1 → S2 → S3 → V → S1 → S2 → ...
-            cycle_length = num_submitters + 1  # submitters + validator
+        for i, (role, task_id_tmpl, submitter_id) in enumerate(structure):
+            if submitter_id:
+                sub_seq = sub_seqs[submitter_id - 1]
+                task_id = task_id_tmpl % sub_seq
+                sub_seqs[submitter_id - 1] = sub_seq + 1
+            else:
+                task_id = task_id_tmpl % val_seq
+                val_seq += 1
             
-            for i in range(20):
-                position_in_cycle = i % cycle_length
-                
-                if position_in_cycle < num_submitters:
-                    # Submitter turn
-                    submitter_id = position_in_cycle + 1
-                    sub_seq = submitter_sequences.get(submitter_id, 0)
-                    tasks.append(WorkflowTask(
-                        task_id=f"agg_sub{submitter_id}_{sub_seq:03d}",
-                        sequence_number=display_seq + 1,
-                        role=f"Submitter {submitter_id}" + (" (Main Submitter)" if submitter_id == 1 else ""),
-                        mode=None,
-                        provider="lm_studio"
-                    ))
-                    submitter_sequences[submitter_id] = sub_seq + 1
-                else:
-                    # Validator turn
-                    tasks.append(WorkflowTask(
-                        task_id=f"agg_val_{val_seq:03d}",
-                        sequence_number=display_seq + 1,
-                        role="Validator",
-                        mode=None,
-                        provider="lm_studio"
-                    ))
-                    val_seq += 1
-                
-                display_seq += 1
-        else:
-            # Multi-model mode: S1, S2, S3 (parallel) → V → S1, S2, S3 → V
-            for i in range(20):
-                position_in_cycle = i % (num_submitters + 1)
-                
-                if position_in_cycle < num_submitters:
-                    # Submitter turn (parallel execution)
-                    submitter_id = position_in_cycle + 1
-                    sub_seq = submitter_sequences.get(submitter_id, 0)
-                    tasks.append(WorkflowTask(
-                        task_id=f"agg_sub{submitter_id}_{sub_seq:03d}",
-                        sequence_number=display_seq + 1,
-                        role=f"Submitter {submitter_id}" + (" (Main Submitter)" if submitter_id == 1 else ""),
-                        mode=None,
-                        provider="lm_studio"
-                    ))
-                    submitter_sequences[submitter_id] = sub_seq + 1
-                else:
-                    # Validator turn (after all submitters)
-                    tasks.append(WorkflowTask(
-                        task_id=f"agg_val_{val_seq:03d}",
-                        sequence_number=display_seq + 1,
-                        role="Validator",
-                        mode=None,
-                        provider="lm_studio"
-                    ))
-                    val_seq += 1
-                
-                display_seq += 1
+            tasks[i] = WorkflowTask(
+                task_id=task_id,
+                sequence_number=current_sequence + i + 1,
+                role=role,
+                mode=None,
+                provider="lm_studio"
+            )
         
         return tasks
     
@@ -129,77 +191,7 @@ class WorkflowPredictor:
         Returns:
             List of 20 predicted workflow tasks
         """
-        tasks = []
-        seq = current_sequence
-        
-        if not outline_accepted:
-            # Outline creation phase (iterative): HC → V → HC → V (max 15 iterations)
-            for i in range(min(20, 30)):  # 15 iterations max = 30 tasks
-                if i % 2 == 0:
-                    tasks.append(WorkflowTask(
-                        task_id=f"comp_hc_outline_{seq:03d}",
-                        sequence_number=seq + 1,
-                        role="High-Context",
-                        mode="Outline Creation",
-                        provider="lm_studio"
-                    ))
-                else:
-                    tasks.append(WorkflowTask(
-                        task_id=f"comp_val_outline_{seq:03d}",
-                        sequence_number=seq + 1,
-                        role="Validator",
-                        mode="Outline Review",
-                        provider="lm_studio"
-                    ))
-                seq += 1
-                
-                if len(tasks) >= 20:
-                    break
-        else:
-            # Paper construction phase - Construction cycle pattern
-            # HC(const) → V → HC(const) → V → HC(const) → V → HC(const) → V → 
-            # HC(outline) → V → HC(review) → V → HC(review) → V → HP(rigor) → V
-            
-            cycle_pattern = [
-                ("High-Context", "Construction"),
-                ("Validator", "Construction Review"),
-                ("High-Context", "Construction"),
-                ("Validator", "Construction Review"),
-                ("High-Context", "Construction"),
-                ("Validator", "Construction Review"),
-                ("High-Context", "Construction"),
-                ("Validator", "Construction Review"),
-                ("High-Context", "Outline Update"),
-                ("Validator", "Outline Review"),
-                ("High-Context", "Paper Review"),
-                ("Validator", "Review Validation"),
-                ("High-Context", "Paper Review"),
-                ("Validator", "Review Validation"),
-                ("High-Param", "Rigor Enhancement"),
-                ("Validator", "Rigor Review"),
-            ]
-            
-            for i in range(20):
-                pattern_idx = i % len(cycle_pattern)
-                role, mode = cycle_pattern[pattern_idx]
-                
-                if role == "High-Context":
-                    task_id = f"comp_hc_{seq:03d}"
-                elif role == "High-Param":
-                    task_id = f"comp_hp_{seq:03d}"
-                else:
-                    task_id = f"comp_val_{seq:03d}"
-                
-                tasks.append(WorkflowTask(
-                    task_id=task_id,
-                    sequence_number=seq + 1,
-                    role=role,
-                    mode=mode,
-                    provider="lm_studio"
-                ))
-                seq += 1
-        
-        return tasks[:20]
+        return _build_tasks(_compiler_structure(outline_accepted), current_sequence)
     
     @staticmethod
     def predict_autonomous_workflow(
@@ -222,9 +214,6 @@ class WorkflowPredictor:
         Returns:
             List of 20 predicted workflow tasks
         """
-        tasks = []
-        seq = current_sequence
-        
         if current_tier == "tier1_aggregation":
             # Brainstorm aggregation - Same as Aggregator workflow
             return WorkflowPredictor.predict_aggregator_workflow(
@@ -244,30 +233,7 @@ class WorkflowPredictor:
         else:
             # Topic selection or idle
             # Predict generic topic selection workflow
-            topic_pattern = [
-                ("Topic Selector", "Topic Selection"),
-                ("Topic Validator", "Topic Validation"),
-            ]
-            
-            for i in range(20):
-                pattern_idx = i % len(topic_pattern)
-                role, mode = topic_pattern[pattern_idx]
-                
-                if "Selector" in role:
-                    task_id = f"auto_ts_{seq:03d}"
-                else:
-                    task_id = f"auto_tv_{seq:03d}"
-                
-                tasks.append(WorkflowTask(
-                    task_id=task_id,
-                    sequence_number=seq + 1,
-                    role=role,
-                    mode=mode,
-                    provider="lm_studio"
-                ))
-                seq += 1
-            
-            return tasks
+            return _build_tasks(_TOPIC_STRUCTURE, current_sequence)
 
 
 # Global instance